@@ -1,9 +1,19 @@
 import os
+import re
+import stat
+import string
 import sys
+import json
+import hashlib
+import ast
+import threading
+import concurrent.futures
 import logging
+import importlib.util
+import time
 import traceback
-import contextlib
-from io import StringIO
+import linecache
+from collections import OrderedDict
 from datetime import datetime
 
 # The standard Slicer imports
@@ -42,6 +52,124 @@ except Exception as e:
 # and must match what the service currently advertises at JETSTREAM_BASE_URL + "/models".
 JETSTREAM_BASE_URL = "https://llm.jetstream-cloud.org/v1"
 
+# OpenAI-compatible clients shared by all logic instances, keyed by endpoint URL.
+# A changed endpoint gets a new client; the same endpoint reuses its connection pool.
+_clientCache = {}
+
+# openai.OpenAI, imported on first use: the import takes a noticeable moment, so it is
+# paid when the first request is sent rather than when the module is opened. httpx, which
+# openai depends on, is imported alongside it for the client's connection pool.
+_openAIClass = None
+_httpx = None
+
+
+def _get_openai():
+    """Return the openai.OpenAI class, importing it (and httpx) once. Raises ImportError if not installed."""
+    global _openAIClass, _httpx
+    if _openAIClass is None:
+        from openai import OpenAI
+        import httpx
+        _openAIClass = OpenAI
+        _httpx = httpx
+    return _openAIClass
+
+# Directories this module has added to sys.path (avoids a linear scan of sys.path per request)
+_appended_paths = set()
+
+# Answers to "Ask a Question" requests are cached so re-sending a near-identical
+# question (differing only in case or spacing) skips the LLM call
+ANSWER_CACHE_MAX_ENTRIES = 1000
+ANSWER_CACHE_TTL_SECONDS = 3600
+
+# Generated-code responses are cached by a SHA-256 of everything sent to the model, in
+# memory and as <sha>.py files in this directory next to the Slicer settings file
+RESPONSE_CACHE_DIR_NAME = "DeveloperAgent-Cache"
+RESPONSE_CACHE_TTL_SECONDS = 3600
+# In-memory entries kept for the session; the least frequently used one is evicted first
+RESPONSE_CACHE_MEMORY_ENTRIES = 128
+# Files kept on disk; expired files and the oldest beyond this are pruned on each write
+RESPONSE_CACHE_MAX_FILES = 500
+# 'on': read and write, 'read_only': never store, 'write_only': always call the API but store, 'off'
+RESPONSE_CACHE_MODES = ('on', 'read_only', 'write_only', 'off')
+
+# While waiting for a response, report streaming progress at most this often
+STREAM_PROGRESS_INTERVAL_MS = 1000
+
+# Buffer size for reading and writing script files
+FILE_BUFFER_BYTES = 1 << 17
+
+# Replaces the Monaco editor content (%s: a JSON string literal). Validation
+# decorations are switched off for the bulk replace and restored once it has rendered.
+MONACO_SET_VALUE_JS = (
+    "window.editor.updateOptions({renderValidationDecorations: 'off'});"
+    " window.editor.getModel().setValue(%s);"
+    " setTimeout(function() { window.editor.updateOptions({renderValidationDecorations: 'editable'}); }, 0);")
+
+# Text blocks (paragraphs) kept in the conversation view; older ones are discarded
+CONVERSATION_MAX_BLOCKS = 2000
+
+# Longest error text rendered in the conversation view; the full text goes to the log
+ERROR_PREVIEW_CHARS = 2048
+
+# Longest error summary fed back to the model on a debug attempt
+ERROR_HISTORY_MAX_CHARS = 2048
+# Innermost stack frames of the script's error kept in that summary; the innermost frame in
+# the generated script itself is always kept too, even when the error is raised deeper
+ERROR_HISTORY_FRAMES = 2
+# Compiled scripts get this filename prefix, which marks their frames in a traceback
+SCRIPT_FILENAME_PREFIX = "<script_"
+
+# Debug attempts request this many candidate fixes concurrently and keep the first that parses
+PARALLEL_DEBUG_CANDIDATES = 3
+
+# Starting point sent as code context when a new script is generated (see get_script_template)
+_SCRIPT_TEMPLATE = string.Template('''"""
+${scriptName} - Generated by DeveloperAgent
+This script implements custom functionality for 3D Slicer
+"""
+
+import slicer
+import slicer.util
+import logging
+
+# Your implementation goes here
+print("Script executed successfully!")
+''')
+
+# validateSlicerCode patterns, compiled once so each check is a single pass over the code
+_LOWERCASE_VTK_METHODS = ('.getname(', '.setname(', '.getid(', '.setvisibility(')
+_LOWERCASE_VTK_RE = re.compile('|'.join(re.escape(p) for p in _LOWERCASE_VTK_METHODS))
+_DOWNLOAD_WITHOUT_INDEX_RE = re.compile(r'SampleData\.downloadFromURL\([^)]+\)(?!\[0\])')
+
+# Response cleanup patterns: reasoning blocks from thinking models, and the opening line of
+# the first markdown code fence (the code runs from there to the last closing fence)
+_THINK_RE = re.compile(r'<think>.*?</think>', re.DOTALL | re.IGNORECASE)
+_CODE_FENCE_RE = re.compile(r'```(?:python|py)?[^\S\n]*\n')
+# Leading comment lines containing one of these words are model explanations, not code comments
+_LEAD_COMMENT_WORDS = ('here', 'this', 'implementation', 'solution')
+
+# API error classification in call_ai: one case-insensitive scan of the message per category
+_RATE_LIMIT_ERROR_RE = re.compile(r'429|rate limit', re.IGNORECASE)
+_AUTH_ERROR_RE = re.compile(r'401|authentication|invalid', re.IGNORECASE)
+_WAIT_SECONDS_RE = re.compile(r'wait (\d+) seconds', re.IGNORECASE)
+
+# debugScriptEditor lists Script Editor attributes whose names contain one of these words
+_EDITOR_ATTR_KEYWORDS = frozenset(('file', 'script', 'load', 'open', 'save', 'text', 'editor'))
+
+
+class RequestCancelled(Exception):
+    """Raised when the user cancels a request that is waiting on the AI service"""
+
+
+class ScriptFailure(Exception):
+    """Raised in the debug loop when a generated script fails to compile or run.
+    Carries the script's own exception and its formatted traceback."""
+
+    def __init__(self, stage, error, script_traceback):
+        Exception.__init__(self, f"{stage}: {type(error).__name__}: {error}")
+        self.error = error
+        self.script_traceback = script_traceback
+
 #
 # DeveloperAgent
 #
@@ -67,6 +195,31 @@ class DeveloperAgentLogic(ScriptedLoadableModuleLogic):
         # Track last created/updated script for quick opening in Script Editor
         self.lastScriptNodeID = None
         self.lastScriptFilePath = None
+        # (model, normalized question) -> (answer, timestamp), least recently used first
+        self._answerCache = OrderedDict()
+        # sha256 of (model, prompts, parameters) -> [raw model response, timestamp, hit count]
+        self._responseCache = {}
+        self._cacheMode = 'on'
+        # (cache key, response or None if it came from the cache) of the last call_ai call;
+        # settled by _settleResponseCache once the script it produced has been run
+        self._pendingResponse = None
+        self.stats = {'hits': 0, 'misses': 0}
+        # Static part of the prompt configuration, built on first use by _get_prompts
+        self._staticPrompts = None
+        # blake2b digest of script source -> code object, reset for every request
+        self._compileCache = {}
+        # blake2b digest of script source -> ast tree parsed by call_ai, consumed by _compiledScript
+        self._parsedTrees = {}
+        # Globals for executing generated scripts, built on first use; each run gets a copy
+        self._execNamespace = None
+        # (script name, text) of the last get_script_template result
+        self._scriptTemplateCache = (None, None)
+        # Network calls run on worker threads so the Slicer UI keeps processing events
+        self._executor = None
+        self._cancelEvent = threading.Event()
+        self._streamedChars = 0
+        # Dump prompt excerpts, failing code and full tracebacks to the log
+        self._verbose = False
         
         # Report prompt configuration source
         if PROMPTS_LOADED:
@@ -80,43 +233,51 @@ class DeveloperAgentLogic(ScriptedLoadableModuleLogic):
         Args:
             user_request: The user's request text for RAG retrieval
         """
+        # The static configuration is assembled once per logic instance; only the
+        # retrieved documentation changes between requests
+        if self._staticPrompts is None:
+            if PROMPTS_LOADED:
+                self._staticPrompts = {
+                    'base': slicer_prompts.SYSTEM_PROMPT_BASE,
+                    'slicer_docs': "",
+                    'script_requirements': slicer_prompts.SYSTEM_PROMPT_SCRIPT_REQUIREMENTS,
+                    'user_template': slicer_prompts.USER_PROMPT_TEMPLATE,
+                    'error_section': slicer_prompts.ERROR_ANALYSIS_SECTION,
+                    'ai_params': slicer_prompts.AI_PARAMETERS,
+                    'available_models': getattr(slicer_prompts, 'AVAILABLE_MODELS', []),
+                    'default_model': getattr(slicer_prompts, 'DEFAULT_MODEL', 'gpt-oss-120b'),
+                    'conversational_prompt': getattr(slicer_prompts, 'SYSTEM_PROMPT_CONVERSATIONAL', ''),
+                    'version': getattr(slicer_prompts, 'PROMPT_VERSION', 'unknown')
+                }
+            else:
+                # Built-in fallback prompts (abbreviated for space)
+                self._staticPrompts = self._get_builtin_prompts()
+            # Full system prompt for script generation, concatenated once
+            self._staticPrompts['script_system'] = (
+                self._staticPrompts['base'] + self._staticPrompts['script_requirements'])
+
+        prompts = dict(self._staticPrompts)
         if PROMPTS_LOADED:
-            # Load Slicer documentation dynamically using RAG
-            slicer_docs = self._load_slicer_documentation(user_request)
-            
-            # Append documentation to base prompt
-            base_prompt = slicer_prompts.SYSTEM_PROMPT_BASE
-            if slicer_docs:
-                base_prompt += f"\n\n{slicer_docs}"
-            
-            return {
-                'base': base_prompt,
-                'script_requirements': slicer_prompts.SYSTEM_PROMPT_SCRIPT_REQUIREMENTS,
-                'user_template': slicer_prompts.USER_PROMPT_TEMPLATE,
-                'error_section': slicer_prompts.ERROR_ANALYSIS_SECTION,
-                'ai_params': slicer_prompts.AI_PARAMETERS,
-                'available_models': getattr(slicer_prompts, 'AVAILABLE_MODELS', []),
-                'default_model': getattr(slicer_prompts, 'DEFAULT_MODEL', 'gpt-oss-120b'),
-                'conversational_prompt': getattr(slicer_prompts, 'SYSTEM_PROMPT_CONVERSATIONAL', ''),
-                'version': getattr(slicer_prompts, 'PROMPT_VERSION', 'unknown')
-            }
-        else:
-            # Built-in fallback prompts (abbreviated for space)
-            return self._get_builtin_prompts()
+            # Load Slicer documentation dynamically using RAG. It is kept separate from
+            # the static base prompt so callers can place it after the static text and
+            # keep an identical prompt prefix across requests (server-side prefix caching).
+            prompts['slicer_docs'] = self._load_slicer_documentation(user_request)
+        return prompts
     
     def _load_slicer_documentation(self, user_request=""):
         """Load Slicer API documentation using RAG for targeted retrieval"""
         try:
             # Import RAG retriever from Resources directory
-            import sys
             resources_dir = os.path.join(os.path.dirname(__file__), 'Resources')
-            if resources_dir not in sys.path:
-                sys.path.insert(0, resources_dir)
+            if resources_dir not in _appended_paths:
+                if resources_dir not in sys.path:
+                    sys.path.insert(0, resources_dir)
+                _appended_paths.add(resources_dir)
             
-            from rag_retriever import SlicerRAG
+            from rag_retriever import get_rag_retriever
             
-            # Initialize RAG retriever
-            rag = SlicerRAG()
+            # Shared RAG retriever; indexes are only reloaded when they change on disk
+            rag = get_rag_retriever()
             
             # Retrieve examples relevant to user's specific request
             if user_request:
@@ -139,10 +300,12 @@ class DeveloperAgentLogic(ScriptedLoadableModuleLogic):
         return {
             'base': """You are an expert 3D Slicer Python developer. Generate working Python code.
             Use proven patterns. Output ONLY code, no markdown.""",
+            'slicer_docs': "",
             'script_requirements': """
             Write standalone scripts for Slicer console.
             Include imports, error handling, and print statements.""",
             'user_template': """
+{slicer_docs}
 USER REQUEST: {prompt}
 {error_section}
 CODE CONTEXT: {code_context}
@@ -174,6 +337,24 @@ Analyze the error and fix it.""",
         """Get the number of debug iterations"""
         return getattr(self, '_debugIterations', 2)
     
+    def setCacheMode(self, mode):
+        """Set the response cache mode, one of RESPONSE_CACHE_MODES"""
+        if mode not in RESPONSE_CACHE_MODES:
+            raise ValueError(f"Unknown cache mode: {mode}")
+        self._cacheMode = mode
+
+    def getCacheMode(self):
+        """Get the response cache mode"""
+        return self._cacheMode
+
+    def setVerbose(self, verbose):
+        """Set whether prompt excerpts, failing code and full tracebacks are logged"""
+        self._verbose = bool(verbose)
+
+    def getVerbose(self):
+        """Get whether verbose diagnostics are logged"""
+        return self._verbose
+
     def setModel(self, model):
         """Set the AI model to use"""
         self._model = model
@@ -187,11 +368,12 @@ Analyze the error and fix it.""",
             default_model = 'gpt-oss-120b'
         return getattr(self, '_model', default_model)
 
-    def loadScriptIntoScene(self, script_file_path):
+    def loadScriptIntoScene(self, script_file_path, file_content=None):
         """Load a .py file into the MRML scene as a Python script text node using Script Editor conventions.
         - Reuses Script Editor storage helper if available
         - Ensures mimetype is set so Subject Hierarchy assigns correct icon/behavior
         - Avoids duplicate nodes if the script is already in the scene
+        - Uses file_content instead of reading the file when the caller just wrote it
         Returns: (node, message) where node is vtkMRMLTextNode or None.
         """
         try:
@@ -206,8 +388,9 @@ Analyze the error and fix it.""",
                     st = n.GetStorageNode()
                     if st and st.GetFileName() == script_file_path:
                         # Ensure correct attributes and refresh content from disk
-                        with open(script_file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
+                        content = file_content if file_content is not None else self.read_code(script_file_path)
+                        if content is None:
+                            return None, f"Could not read file: {script_file_path}"
                         n.SetText(content)
                         n.SetAttribute("mimetype", "text/x-python")
                         n.SetAttribute("customTag", "pythonFile")
@@ -223,8 +406,9 @@ Analyze the error and fix it.""",
                 existing.UnRegister(None) if existing is not None else None
 
             # Read content and create a new text node
-            with open(script_file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            content = file_content if file_content is not None else self.read_code(script_file_path)
+            if content is None:
+                return None, f"Could not read file: {script_file_path}"
 
             text_node = slicer.mrmlScene.AddNewNodeByClass('vtkMRMLTextNode')
             text_node.SetName(os.path.basename(script_file_path))
@@ -313,14 +497,95 @@ Analyze the error and fix it.""",
         except Exception:
             return False
 
+    def _wait_until(self, predicate, timeout_ms):
+        """Run a local Qt event loop until predicate() is true or timeout_ms elapses.
+        The UI keeps running meanwhile and no time is spent sleeping.
+        Returns the last value of predicate()."""
+        def check():
+            try:
+                return bool(predicate())
+            except Exception:
+                return False
+
+        if check():
+            return True
+        loop = qt.QEventLoop()
+        poll = qt.QTimer()
+        poll.setInterval(20)
+        poll.timeout.connect(lambda: loop.quit() if check() else None)
+        deadline = qt.QTimer()
+        deadline.setSingleShot(True)
+        deadline.timeout.connect(loop.quit)
+        poll.start()
+        deadline.start(timeout_ms)
+        loop.exec_()
+        poll.stop()
+        deadline.stop()
+        return check()
+
+    def cancelRequest(self):
+        """Stop waiting for the AI response of the request in progress"""
+        self._cancelEvent.set()
+
+    def _getExecutor(self):
+        """Thread pool used for network calls, created on first use"""
+        if self._executor is None:
+            # Several workers: parallel debug candidates, and a cancelled call still
+            # finishing in the background must not hold up the next request
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=PARALLEL_DEBUG_CANDIDATES + 1, thread_name_prefix="DeveloperAgent")
+        return self._executor
+
+    def _runInBackground(self, fn, *args):
+        """Run fn(*args) on a worker thread and return its result.
+
+        The main thread keeps processing Qt events meanwhile, so the UI stays
+        responsive. fn must not touch Qt or MRML. Raises RequestCancelled if
+        cancelRequest() is called before fn finishes.
+        """
+        self._streamedChars = 0
+        future = self._getExecutor().submit(fn, *args)
+        reported = 0
+        while not self._wait_until(lambda: future.done() or self._cancelEvent.is_set(), STREAM_PROGRESS_INTERVAL_MS):
+            if self._streamedChars != reported:
+                reported = self._streamedChars
+                self.diagnostic_print(f"Receiving response... {reported} chars so far")
+        if self._cancelEvent.is_set():
+            raise RequestCancelled()
+        return future.result()
+
+    def _streamCompletion(self, client, request_args, cancel, stop=None):
+        """Run a streaming chat completion and return the concatenated text (worker thread).
+        Streaming ends early when `cancel` (the owning request's cancel event) or `stop` is set."""
+        stream = client.chat.completions.create(stream=True, **request_args)
+        parts = []
+        try:
+            for chunk in stream:
+                if cancel.is_set() or (stop is not None and stop.is_set()):
+                    break
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    parts.append(content)
+                    self._streamedChars += len(content)
+        finally:
+            if hasattr(stream, 'close'):
+                stream.close()
+        return "".join(parts)
+
     def diagnostic_print(self, message, error=False):
-        """Print diagnostic message to both log and UI"""
+        """Send diagnostic message to the log and UI.
+        Slicer's log handler already echoes to the Python console, so there is no separate
+        print, and the message line is only built when the UI callback needs it."""
+        callback = self._outputCallback
+        if not callback and not logging.getLogger().isEnabledFor(logging.INFO):
+            return
         timestamp = datetime.now().strftime('%H:%M:%S')
-        formatted_msg = f"[{timestamp}] {'❌ ' if error else ''}" + message
-        print(formatted_msg)
-        logging.info(formatted_msg)
-        if self._outputCallback:
-            self._outputCallback(formatted_msg)
+        prefix = '❌ ' if error else ''
+        logging.info('[%s] %s%s', timestamp, prefix, message)
+        if callback:
+            callback(f"[{timestamp}] {prefix}{message}")
     
     def _notifyNodeContentChanged(self, textNode):
         """Notify that a text node's content has changed - must be called from main thread"""
@@ -332,22 +597,41 @@ Analyze the error and fix it.""",
         Jetstream2 inference is free and needs no API key when reached from the
         Jetstream2 network, so a placeholder key is sent. Returns (client, error):
         on success error is None; on failure client is None and error is a message.
+        One client per endpoint is created and shared module-wide, so its HTTP
+        connection pool survives between requests, debug attempts and logic instances.
         """
+        client = _clientCache.get(JETSTREAM_BASE_URL)
+        if client is not None:
+            return client, None
+
         try:
-            from openai import OpenAI
+            OpenAI = _get_openai()
         except ImportError:
             return None, "OpenAI library not found. Please install it with: pip install openai"
 
         # Jetstream2 serves every model from one unified endpoint (LiteLLM); the model
         # is selected by name in each request, so no per-model URL lookup is needed.
         try:
-            client = OpenAI(api_key="empty", base_url=JETSTREAM_BASE_URL)
+            # Keep sockets alive between calls of the debug loop. HTTP/2 needs the
+            # optional 'h2' package, so it is only enabled when that is installed.
+            http_client = _httpx.Client(
+                http2=importlib.util.find_spec("h2") is not None,
+                limits=_httpx.Limits(max_keepalive_connections=4, keepalive_expiry=60),
+                timeout=_httpx.Timeout(600.0, connect=10.0))
+            client = OpenAI(api_key="empty", base_url=JETSTREAM_BASE_URL, http_client=http_client)
+            _clientCache[JETSTREAM_BASE_URL] = client
             return client, None
         except Exception as e:
             return None, f"Failed to initialize AI client: {str(e)}"
 
+    def _newCancelEvent(self):
+        """Give the request about to start its own cancel event. A worker of an earlier,
+        cancelled request still holds that request's (set) event, so it keeps stopping."""
+        self._cancelEvent = threading.Event()
+
     def processRequestToNode(self, userPrompt, textNode, outputPath=None, existingCode=None):
         """Process request and write generated code directly to a text node"""
+        self._newCancelEvent()
         client, error = self._createClient()
         if error:
             return {"success": False, "error": error}
@@ -362,36 +646,53 @@ Analyze the error and fix it.""",
 
     def processConversationalRequest(self, userPrompt):
         """Answer a plain-language question without generating any code."""
+        self._newCancelEvent()
         client, error = self._createClient()
         if error:
             return {"success": False, "error": error}
 
+        model_name = self.getModel()
+        cache_key = (model_name, self._normalizeQuestion(userPrompt))
+        # The answer cache follows the same mode as the response cache
+        cached = self._answerCache.get(cache_key) if self._cacheMode in ('on', 'read_only') else None
+        if cached is not None:
+            answer, timestamp = cached
+            if time.time() - timestamp < ANSWER_CACHE_TTL_SECONDS:
+                self._answerCache.move_to_end(cache_key)
+                self.diagnostic_print("Answer served from cache (same question asked earlier)")
+                return {"success": True, "response": answer}
+            del self._answerCache[cache_key]
+
         try:
-            model_name = self.getModel()
             prompts = self._get_prompts(user_request=userPrompt)
             system_prompt = prompts.get('conversational_prompt', '')
             ai_params = prompts.get('ai_params', {})
 
             self.diagnostic_print(f"Conversational request to model: {model_name}")
 
-            response = client.chat.completions.create(
-                model=model_name,
-                messages=[
+            # Streamed like code generation so progress shows while the answer is written
+            answer = self._runInBackground(self._streamCompletion, client, {
+                'model': model_name,
+                'messages': [
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": userPrompt}
                 ],
-                temperature=ai_params.get('temperature', 0.5),
-                max_tokens=ai_params.get('max_tokens', 2048)
-            )
-
-            answer = response.choices[0].message.content.strip()
+                'temperature': ai_params.get('temperature', 0.5),
+                'max_tokens': ai_params.get('max_tokens', 2048),
+            }, self._cancelEvent).strip()
 
             # Strip <think> tags from reasoning models
-            import re
-            answer = re.sub(r'<think>.*?</think>', '', answer, flags=re.DOTALL | re.IGNORECASE).strip()
+            answer = _THINK_RE.sub('', answer).strip()
+
+            if answer and self._cacheMode in ('on', 'write_only'):
+                self._answerCache[cache_key] = (answer, time.time())
+                if len(self._answerCache) > ANSWER_CACHE_MAX_ENTRIES:
+                    self._answerCache.popitem(last=False)
 
             return {"success": True, "response": answer}
 
+        except RequestCancelled:
+            return {"success": False, "error": "Request cancelled by user."}
         except Exception as e:
             self.diagnostic_print(f"Conversational request failed: {e}", error=True)
             return {"success": False, "error": str(e)}
@@ -402,15 +703,24 @@ Analyze the error and fix it.""",
 
 
 
+    @staticmethod
+    def _normalizeQuestion(text):
+        """Fold case and whitespace so questions differing only in those share a cache entry"""
+        return " ".join(text.lower().split())
+
     def createScriptToNode(self, client, userPrompt, textNode, scriptName, outputPath=None, existingCode=None):
         """Create a Python script and write it directly to a text node"""
-        import traceback
+        self._compileCache.clear()
+        self._parsedTrees.clear()
         
         max_debug_attempts = self.getDebugIterations()
         current_code = existingCode  # Start with existing code if provided
         error_history = ""
+        # Digests of scripts that already failed in this request
+        failed_digests = set()
         
         for attempt in range(max_debug_attempts + 1):
+            code_digest = None
             try:
                 if attempt == 0:
                     if existingCode:
@@ -444,11 +754,21 @@ Analyze the error and fix it.""",
 
                 # Get script template for context (only if no existing code)
                 script_template = existingCode or self.get_script_template(scriptName)
-                new_code = self.call_ai(client, prompt_for_creation, current_code or script_template, error_history, "script")
+                new_code = self.call_ai(client, prompt_for_creation, current_code or script_template, error_history, "script",
+                                        candidates=PARALLEL_DEBUG_CANDIDATES if attempt > 0 else 1)
                 
                 if new_code is None:
+                    if self._cancelEvent.is_set():
+                        return {"success": False, "error": "Request cancelled by user."}
                     return {"success": False, "error": "AI API call failed. Check the conversation log for details."}
 
+                # The same script fails the same way again, so don't spend another attempt on it
+                code_digest = self._codeDigest(new_code)
+                if code_digest in failed_digests:
+                    self._settleResponseCache(False)
+                    self.diagnostic_print("AI returned code identical to a previous failing attempt", error=True)
+                    return {"success": False, "error": f"AI returned code identical to a previous failing attempt. Last error:\n{error_history}"}
+
                 # Store the generated code
                 current_code = new_code
                 
@@ -459,8 +779,7 @@ Analyze the error and fix it.""",
                 # Optionally save to file if output path provided
                 if outputPath:
                     scripts_dir = os.path.join(outputPath, "Scripts")
-                    if not os.path.exists(scripts_dir):
-                        os.makedirs(scripts_dir)
+                    os.makedirs(scripts_dir, exist_ok=True)
                     script_file_path = os.path.join(scripts_dir, f"{scriptName}.py")
                     self.write_code(script_file_path, new_code)
                     
@@ -472,21 +791,16 @@ Analyze the error and fix it.""",
                     storageNode.SetFileName(script_file_path)
                 
                 # Test the script (safe - no MRML operations)
-                try:
-                    compile(new_code, f"<{scriptName}>", 'exec')
-                except SyntaxError as e:
-                    raise RuntimeError(f"Syntax error in generated script: {str(e)}")
-
-                test_success, test_error = self.testScriptExecution(new_code, scriptName)
+                test_success, test_error, test_traceback = self.testScriptExecution(new_code, scriptName)
                 if not test_success:
-                    raise RuntimeError(f"Script execution test failed: {test_error}")
+                    raise ScriptFailure("Script execution test failed", test_error, test_traceback)
                 
                 # Execute in Slicer
-                exec_success, exec_error = self.executeScriptInSlicer(new_code, scriptName)
+                exec_success, exec_error, exec_traceback = self.executeScriptInSlicer(new_code, scriptName)
                 if not exec_success:
                     if attempt == 0:
                         self.diagnostic_print(f"Initial attempt failed, debugging...")
-                    raise RuntimeError(f"Script runtime execution failed: {exec_error}")
+                    raise ScriptFailure("Script runtime execution failed", exec_error, exec_traceback)
                 
                 # Success!
                 result_message = f"Script '{scriptName}' generated successfully"
@@ -494,33 +808,34 @@ Analyze the error and fix it.""",
                     result_message += f" after {attempt} debug attempts"
                 result_message += ". Code written to node and ready to execute."
                 
+                self._settleResponseCache(True)
                 return {"success": True, "message": result_message}
 
             except Exception as e:
-                error_msg = f"Error on attempt {attempt + 1}:\\n{str(e)}"
+                error_msg = f"Error on attempt {attempt + 1}:\n{str(e)}"
                 if attempt == max_debug_attempts:
                     # Only show detailed error on final attempt
-                    self.diagnostic_print(f"❌ Script generation failed:\\n{error_msg}", error=True)
+                    self.diagnostic_print(f"❌ Script generation failed:\n{error_msg}", error=True)
                 
-                formatted_error = f"""
+                self._settleResponseCache(False)
+                if code_digest is not None:
+                    failed_digests.add(code_digest)
+
+                # The failing code is already sent as the code context, so only the
+                # essential lines of the script's own error are fed back to the model
+                cause, full_traceback = self._errorCause(e)
+                error_history = f"""
 ATTEMPT {attempt + 1} FAILED:
-Error Type: {type(e).__name__}
-Error Message: {str(e)}
-
-Generated Code That Failed:
-{new_code if 'new_code' in locals() else 'No code generated'}
-
-Full Traceback:
-{traceback.format_exc()}
+{self._compact_error(cause)}
 """
-                error_history = formatted_error
                 
                 if attempt == max_debug_attempts:
-                    return {"success": False, "error": f"Failed to create script after {max_debug_attempts} debug attempts. Final error: {str(e)}\\n\\nError History:\\n{error_history}"}
+                    return {"success": False, "error": f"Failed to create script after {max_debug_attempts} debug attempts. Final error: {str(e)}\n\nFull Traceback:\n{full_traceback}"}
 
     def createSimpleScript(self, client, userPrompt, scriptName, outputPath=None):
         """Create a simple Python script that can be executed in Slicer's Python console"""
-        import traceback
+        self._compileCache.clear()
+        self._parsedTrees.clear()
         
         if outputPath:
             # Use custom output path with Scripts/ScriptName.py structure
@@ -533,14 +848,16 @@ Full Traceback:
             script_file_path = os.path.join(scripts_dir, f"{scriptName}.py")
         
         # Create scripts directory if it doesn't exist
-        if not os.path.exists(scripts_dir):
-            os.makedirs(scripts_dir)
+        os.makedirs(scripts_dir, exist_ok=True)
         
         max_debug_attempts = self.getDebugIterations()
         current_code = None
         error_history = ""
+        # Digests of scripts that already failed in this request
+        failed_digests = set()
         
         for attempt in range(max_debug_attempts + 1):
+            code_digest = None
             try:
                 if attempt == 0:
                     prompt_for_creation = (
@@ -555,11 +872,21 @@ Full Traceback:
 
                 # Get script template for context
                 script_template = self.get_script_template(scriptName)
-                new_code = self.call_ai(client, prompt_for_creation, current_code or script_template, error_history, "script")
+                new_code = self.call_ai(client, prompt_for_creation, current_code or script_template, error_history, "script",
+                                        candidates=PARALLEL_DEBUG_CANDIDATES if attempt > 0 else 1)
                 
                 if new_code is None:
+                    if self._cancelEvent.is_set():
+                        return {"success": False, "error": "Request cancelled by user."}
                     return {"success": False, "error": "AI API call failed. Check the conversation log for details. This may be due to rate limits, invalid API key, or network issues."}
 
+                # The same script fails the same way again, so don't spend another attempt on it
+                code_digest = self._codeDigest(new_code)
+                if code_digest in failed_digests:
+                    self._settleResponseCache(False)
+                    self.diagnostic_print("AI returned code identical to a previous failing attempt", error=True)
+                    return {"success": False, "error": f"AI returned code identical to a previous failing attempt. The script is saved at: {script_file_path}\n\nLast error:\n{error_history}"}
+
                 # Write the script to file
                 self.write_code(script_file_path, new_code)
                 current_code = new_code
@@ -572,42 +899,31 @@ Full Traceback:
                 # Only create text node after ALL attempts are done (success or failure)
                 # Don't create it here on every attempt - it will cause duplicates
                 
-                # Verify file content
-                try:
-                    with open(script_file_path, 'r', encoding='utf-8') as f:
-                        written_content = f.read()
-                    if not written_content.strip():
-                        raise RuntimeError("Script file was created but is empty")
-                    self.diagnostic_print(f"Script file created successfully: {len(written_content)} characters")
-                except Exception as e:
-                    raise RuntimeError(f"Cannot read back written script file: {str(e)}")
+                # Verify content in memory; the file holds exactly new_code
+                if not new_code.strip():
+                    raise RuntimeError("Script file was created but is empty")
+                self.diagnostic_print(f"Script file created successfully: {len(new_code)} characters")
 
                 # Test the script by attempting to compile it
                 self.diagnostic_print(f"Attempt {attempt + 1}: Validating script syntax...")
-                try:
-                    compile(new_code, script_file_path, 'exec')
-                except SyntaxError as e:
-                    raise RuntimeError(f"Syntax error in generated script: {str(e)}")
-
-                # Try to execute the script in a controlled environment to check for basic errors
-                self.diagnostic_print(f"Attempt {attempt + 1}: Testing script execution...")
-                test_success, test_error = self.testScriptExecution(new_code, scriptName)
+                test_success, test_error, test_traceback = self.testScriptExecution(new_code, scriptName)
                 if not test_success:
-                    # Log the actual generated code for debugging
-                    self.diagnostic_print(f"Generated code that failed (first 800 chars):")
-                    self.diagnostic_print(f"---START CODE---")
-                    self.diagnostic_print(new_code[:800])
-                    if len(new_code) > 800:
-                        self.diagnostic_print("...CODE TRUNCATED...")
-                    self.diagnostic_print(f"---END CODE---")
-                    raise RuntimeError(f"Script execution test failed: {test_error}")
+                    if self._verbose:
+                        # Log the actual generated code for debugging
+                        self.diagnostic_print(f"Generated code that failed (first 800 chars):")
+                        self.diagnostic_print(f"---START CODE---")
+                        self.diagnostic_print(new_code[:800])
+                        if len(new_code) > 800:
+                            self.diagnostic_print("...CODE TRUNCATED...")
+                        self.diagnostic_print(f"---END CODE---")
+                    raise ScriptFailure("Script execution test failed", test_error, test_traceback)
                 
                 # Now execute the actual script in Slicer's Python console to catch runtime errors
                 self.diagnostic_print(f"Attempt {attempt + 1}: Executing script in Slicer Python console...")
-                exec_success, exec_error = self.executeScriptInSlicer(new_code, scriptName)
+                exec_success, exec_error, exec_traceback = self.executeScriptInSlicer(new_code, scriptName)
                 if not exec_success:
                     self.diagnostic_print(f"Script execution in Slicer failed: {exec_error}")
-                    raise RuntimeError(f"Script runtime execution failed: {exec_error}")
+                    raise ScriptFailure("Script runtime execution failed", exec_error, exec_traceback)
                 
                 # If we get here, script was created and tested successfully
                 result_message = f"Script '{scriptName}' created and tested successfully"
@@ -620,7 +936,7 @@ Full Traceback:
                     result_message += f". Saved to: {script_file_path}"
                 
                 # Load script as text node on success (no UI switch)
-                node, load_msg = self.loadScriptIntoScene(script_file_path)
+                node, load_msg = self.loadScriptIntoScene(script_file_path, file_content=new_code)
                 if node:
                     self.diagnostic_print(f"Script loaded as text node: {node.GetName()} ({load_msg})")
                     # Remember for quick open
@@ -630,23 +946,24 @@ Full Traceback:
                     self.diagnostic_print(f"Could not load script as text node: {load_msg}")
                 
                 # Script created and tested successfully
+                self._settleResponseCache(True)
                 return {"success": True, "message": result_message}
 
             except Exception as e:
-                error_msg = f"Error on attempt {attempt + 1}:\n{str(e)}\n{traceback.format_exc()}"
+                cause, full_traceback = self._errorCause(e)
+                error_msg = f"Error on attempt {attempt + 1}:\n{str(e)}\n{full_traceback}"
                 self.diagnostic_print(f"Script creation failed:\n{error_msg}", error=True)
                 
                 # Format error for AI to understand and fix
+                self._settleResponseCache(False)
+                if code_digest is not None:
+                    failed_digests.add(code_digest)
+
+                # The failing code is already sent as the code context, so only the
+                # essential lines of the script's own error are fed back to the model
                 formatted_error = f"""
 ATTEMPT {attempt + 1} FAILED:
-Error Type: {type(e).__name__}
-Error Message: {str(e)}
-
-Generated Code That Failed:
-{new_code if 'new_code' in locals() else 'No code generated'}
-
-Full Traceback:
-{traceback.format_exc()}
+{self._compact_error(cause)}
 
 DEBUGGING GUIDANCE:
 - Analyze the error message carefully to understand what went wrong
@@ -660,7 +977,7 @@ DEBUGGING GUIDANCE:
                 if attempt == max_debug_attempts:
                     # Last attempt failed - still try to create text node for manual fixing
                     if os.path.exists(script_file_path):
-                        node, load_msg = self.loadScriptIntoScene(script_file_path)
+                        node, load_msg = self.loadScriptIntoScene(script_file_path, file_content=current_code)
                         if node:
                             self.diagnostic_print(f"Script loaded as text node for manual review: {node.GetName()} ({load_msg})")
                             # Remember for quick open
@@ -669,48 +986,92 @@ DEBUGGING GUIDANCE:
                         else:
                             self.diagnostic_print(f"Could not load script as text node: {load_msg}")
                     
-                    return {"success": False, "error": f"Failed to create script after {max_debug_attempts} debug attempts. Final error: {str(e)}\n\nError History:\n{error_history}"}
+                    return {"success": False, "error": f"Failed to create script after {max_debug_attempts} debug attempts. Final error: {str(e)}\n\nFull Traceback:\n{full_traceback}"}
+
+    @staticmethod
+    def _errorCause(e):
+        """Return (exception, formatted traceback) describing a failed attempt: the generated
+        script's own error for a ScriptFailure, otherwise the exception being handled"""
+        if isinstance(e, ScriptFailure):
+            return e.error, e.script_traceback
+        return e, traceback.format_exc()
+
+    @staticmethod
+    def _compact_error(e):
+        """Exception type and message plus its innermost stack frames, capped at ERROR_HISTORY_MAX_CHARS"""
+        compact = f"{type(e).__name__}: {e}\n"
+        if not isinstance(e, SyntaxError):
+            # A syntax error's message already names the line; its frames are the compiler's
+            all_frames = traceback.extract_tb(e.__traceback__)
+            frames = list(all_frames[-ERROR_HISTORY_FRAMES:])
+            script_frames = [f for f in all_frames if f.filename.startswith(SCRIPT_FILENAME_PREFIX)]
+            if script_frames and not any(f is script_frames[-1] for f in frames):
+                # Raised inside library code: keep the script line that led there
+                frames = [script_frames[-1]] + frames[-1:]
+                compact += "".join(traceback.format_list(frames[:1])) + "  ...\n"
+                compact += "".join(traceback.format_list(frames[1:]))
+            else:
+                compact += "".join(traceback.format_list(frames))
+        if len(compact) > ERROR_HISTORY_MAX_CHARS:
+            half = ERROR_HISTORY_MAX_CHARS // 2
+            compact = compact[:half] + "\n...\n" + compact[-half:]
+        return compact
 
     def get_script_template(self, scriptName):
         """Get a basic template for a Slicer Python script"""
-        return f'''"""
-{scriptName} - Generated by DeveloperAgent
-This script implements custom functionality for 3D Slicer
-"""
-
-import slicer
-import slicer.util
-import logging
-
-# Your implementation goes here
-print("Script executed successfully!")
-'''
+        cachedName, cachedText = self._scriptTemplateCache
+        if cachedName != scriptName:
+            cachedText = _SCRIPT_TEMPLATE.substitute(scriptName=scriptName)
+            self._scriptTemplateCache = (scriptName, cachedText)
+        return cachedText
+
+    @staticmethod
+    def _codeDigest(script_code):
+        """Short fixed-size digest identifying a script's source"""
+        return hashlib.blake2b(script_code.encode('utf-8'), digest_size=16).digest()
+
+    def _compiledScript(self, script_code, script_name):
+        """Compile a script, reusing the code object of an identical earlier attempt"""
+        filename = f"{SCRIPT_FILENAME_PREFIX}{script_name}>"
+        # Register the source so traceback frames in the script show their line of code
+        linecache.cache[filename] = (len(script_code), None, script_code.splitlines(True), filename)
+        digest = self._codeDigest(script_code)
+        code_object = self._compileCache.get(digest)
+        if code_object is None:
+            # Compile from call_ai's parse tree when there is one, so the source is parsed once
+            source = self._parsedTrees.pop(digest, script_code)
+            code_object = compile(source, filename, 'exec')
+            self._compileCache[digest] = code_object
+        return code_object
 
     def testScriptExecution(self, script_code, script_name):
-        """Test script execution in a safe environment - but don't actually execute, just validate"""
+        """Test script execution in a safe environment - but don't actually execute, just validate.
+        Returns (success, exception or None, formatted traceback)."""
         try:
             self.diagnostic_print(f"Testing script '{script_name}' for syntax validation...")
             
-            # Only compile to check syntax - don't execute yet
-            compiled_code = compile(script_code, f"<script_{script_name}>", 'exec')
+            # Only compile to check syntax - don't execute yet. The code object is kept
+            # so an identical script is not compiled again and can be executed directly.
+            self._compiledScript(script_code, script_name)
             
             self.diagnostic_print("  ✓ Script syntax validation completed successfully")
-            return True, ""
+            return True, None, ""
             
         except Exception as e:
-            import traceback
             error_msg = f"{script_name} syntax validation failed: {str(e)}"
+            full_traceback = traceback.format_exc()
             self.diagnostic_print(f"[Python] {error_msg}")
             self.diagnostic_print(f"[Python] Traceback (most recent call last):")
             # Get the traceback and format it properly
-            tb_lines = traceback.format_exc().strip().split('\n')
+            tb_lines = full_traceback.strip().split('\n')
             for line in tb_lines[1:]:  # Skip the first line as it's redundant
                 self.diagnostic_print(f"[Python] {line}")
             self.diagnostic_print("  ❌ Script syntax validation FAILED")
-            return False, error_msg
+            return False, e, full_traceback
 
     def executeScriptInSlicer(self, script_code, script_name):
-        """Execute the script in Slicer's actual Python console and capture any runtime errors"""
+        """Execute the script in Slicer's actual Python console and capture any runtime errors.
+        Returns (success, exception or None, formatted traceback)."""
         try:
             self.diagnostic_print(f"Executing '{script_name}' in Slicer Python console...")
             
@@ -719,15 +1080,16 @@ print("Script executed successfully!")
             # Execute the script directly and let errors propagate
             try:
                 # Execute the script as-is - no mocking, let it fail naturally
-                exec(script_code, {'slicer': slicer, 'logging': logging, 'SampleData': __import__('SampleData'), '__name__': '__main__'})
+                if self._execNamespace is None:
+                    self._execNamespace = {'slicer': slicer, 'logging': logging,
+                                           'SampleData': __import__('SampleData'), '__name__': '__main__'}
+                exec(self._compiledScript(script_code, script_name), dict(self._execNamespace))
                 
                 # If we get here, no exception was raised
                 self.diagnostic_print("  ✓ Script executed successfully in Slicer")
-                return True, ""
+                return True, None, ""
                     
             except Exception as exec_exception:
-                import traceback
-                import sys
                 # Direct execution exception - this is a real runtime error
                 execution_error = str(exec_exception)
                 full_traceback = traceback.format_exc()
@@ -747,13 +1109,13 @@ print("Script executed successfully!")
                 
                 self.diagnostic_print(f"Script execution FAILED with exception: {enhanced_error}")
                 self.diagnostic_print(f"Exception type: {error_details['type']}, repr: {error_details['repr']}")
-                self.diagnostic_print(f"Full traceback: {full_traceback}")
+                if self._verbose:
+                    self.diagnostic_print(f"Full traceback: {full_traceback}")
                 self.diagnostic_print("  ❌ Script execution FAILED in Slicer")
                 
-                return False, f"Script execution failed: {execution_error}\n\nFull traceback:\n{full_traceback}"
+                return False, exec_exception, full_traceback
             
         except Exception as e:
-            import traceback
             error_msg = f"Failed to execute script in Slicer: {str(e)}"
             full_traceback = traceback.format_exc()
             
@@ -762,7 +1124,7 @@ print("Script executed successfully!")
             for line in full_traceback.strip().split('\n'):
                 self.diagnostic_print(f"[Slicer Execution Error] {line}")
             
-            return False, f"{error_msg}\n{full_traceback}"
+            return False, e, full_traceback
 
     def openInScriptEditor(self, script_file_path):
         """Try to open the script file in the Script Editor extension using its file reader"""
@@ -787,7 +1149,6 @@ print("Script executed successfully!")
                     
                     # Find and select the loaded node in Script Editor
                     slicer.util.selectModule('ScriptEditor')
-                    slicer.app.processEvents()
                     
                     # Find the node that was just loaded
                     loadedNodes = slicer.mrmlScene.GetNodesByClass("vtkMRMLTextNode")
@@ -829,8 +1190,6 @@ print("Script executed successfully!")
                 return
             
             slicer.util.selectModule('ScriptEditor')
-            slicer.app.processEvents()
-            qt.QThread.msleep(1000)
             
             widget = slicer.modules.scripteditor.widgetRepresentation()
             if not widget:
@@ -842,22 +1201,26 @@ print("Script executed successfully!")
             self.diagnostic_print("=== Script Editor Widget Debug Info ===")
             self.diagnostic_print(f"Widget type: {type(widget_self)}")
             
-            # List all methods and properties
-            all_attrs = [attr for attr in dir(widget_self) if not attr.startswith('_')]
-            file_related = [attr for attr in all_attrs if any(keyword in attr.lower() for keyword in ['file', 'script', 'load', 'open', 'save', 'text', 'editor'])]
-            
-            self.diagnostic_print(f"File-related attributes: {file_related}")
-            
-            # Check for text editors
+            # One pass over all methods and properties: collect file-related names, and
+            # only fetch attributes whose name suggests a text editor
+            file_related = []
             text_editors = []
-            for attr in all_attrs:
-                try:
-                    obj = getattr(widget_self, attr)
-                    if hasattr(obj, 'setPlainText'):
-                        text_editors.append(f"{attr} ({type(obj)})")
-                except:
+            for attr in dir(widget_self):
+                if attr.startswith('_'):
+                    continue
+                lower_attr = attr.lower()
+                if not any(keyword in lower_attr for keyword in _EDITOR_ATTR_KEYWORDS):
                     continue
+                file_related.append(attr)
+                if 'edit' in lower_attr or 'text' in lower_attr:
+                    try:
+                        obj = getattr(widget_self, attr)
+                        if hasattr(obj, 'setPlainText'):
+                            text_editors.append(f"{attr} ({type(obj)})")
+                    except:
+                        continue
             
+            self.diagnostic_print(f"File-related attributes: {file_related}")
             self.diagnostic_print(f"Text editor attributes: {text_editors}")
             
             # Check children only if findChildren method exists
@@ -879,27 +1242,240 @@ print("Script executed successfully!")
 
 
     def read_code(self, file_path):
+        """Return the file's text, or None if it cannot be read or is not valid UTF-8"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        except: return None
+            with open(file_path, 'rb', buffering=FILE_BUFFER_BYTES) as f:
+                # Read straight into a buffer of the file's size, then pick up
+                # anything appended since the size was taken
+                data = bytearray(os.fstat(f.fileno()).st_size)
+                del data[f.readinto(data):]
+                data += f.read()
+            return data.decode('utf-8')
+        except (OSError, UnicodeDecodeError):
+            return None
 
     def write_code(self, file_path, new_code):
+        """Write code to file without line-ending translation"""
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
+            with open(file_path, 'w', encoding='utf-8', newline='', buffering=FILE_BUFFER_BYTES) as f:
                 f.write(new_code)
-        except: pass
+        except OSError as e:
+            self.diagnostic_print(f"Could not write {file_path}: {e}", error=True)
+
+    def _responseCacheDir(self):
+        """Directory holding on-disk cached model responses"""
+        settings_dir = os.path.dirname(slicer.app.slicerUserSettingsFilePath)
+        return os.path.join(settings_dir, RESPONSE_CACHE_DIR_NAME)
+
+    def _responseCacheKey(self, model_name, system_prompt, user_prompt, ai_params):
+        """Hash everything that determines the model response"""
+        payload = json.dumps({
+            'model': model_name,
+            'system': system_prompt,
+            'user': user_prompt,
+            'params': ai_params,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _readResponseCache(self, key):
+        """Return a cached response from memory or disk, or None on a miss or expired entry"""
+        if self._cacheMode not in ('on', 'read_only'):
+            return None
+        now = time.time()
+        entry = self._responseCache.get(key)
+        if entry is not None:
+            if now - entry[1] < RESPONSE_CACHE_TTL_SECONDS:
+                entry[2] += 1
+                return entry[0]
+            del self._responseCache[key]
+        path = os.path.join(self._responseCacheDir(), f"{key}.py")
+        try:
+            timestamp = os.stat(path).st_mtime
+            if now - timestamp >= RESPONSE_CACHE_TTL_SECONDS:
+                os.remove(path)
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                text = f.read()
+        except OSError:
+            return None
+        self._rememberResponse(key, text, timestamp)
+        return text
+
+    def _rememberResponse(self, key, text, timestamp):
+        """Keep a response in memory, evicting the least frequently used entry when full"""
+        if key not in self._responseCache and len(self._responseCache) >= RESPONSE_CACHE_MEMORY_ENTRIES:
+            coldest = min(self._responseCache, key=lambda k: self._responseCache[k][2])
+            del self._responseCache[coldest]
+        self._responseCache[key] = [text, timestamp, 0]
+
+    def _writeResponseCache(self, key, text):
+        """Store a response in memory and on disk; disk failures only disable persistence"""
+        if self._cacheMode not in ('on', 'write_only'):
+            return
+        self._rememberResponse(key, text, time.time())
+        try:
+            cache_dir = self._responseCacheDir()
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(os.path.join(cache_dir, f"{key}.py"), 'w', encoding='utf-8') as f:
+                f.write(text)
+            self._pruneResponseCacheDir(cache_dir)
+        except OSError as e:
+            logging.warning(f"DeveloperAgent: could not write response cache: {e}")
+
+    def _pruneResponseCacheDir(self, cache_dir):
+        """Delete expired cache files, then the oldest ones beyond RESPONSE_CACHE_MAX_FILES"""
+        now = time.time()
+        live = []
+        with os.scandir(cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith('.py') or not entry.is_file():
+                    continue
+                try:
+                    mtime = entry.stat().st_mtime
+                    if now - mtime >= RESPONSE_CACHE_TTL_SECONDS:
+                        os.remove(entry.path)
+                    else:
+                        live.append((mtime, entry.path))
+                except OSError:
+                    pass
+        if len(live) > RESPONSE_CACHE_MAX_FILES:
+            live.sort()
+            for _, path in live[:len(live) - RESPONSE_CACHE_MAX_FILES]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
 
-    def call_ai(self, client, prompt, code_context, error_history, request_type="script"):
+    def _evictResponseCache(self, key):
+        """Forget a cached response in memory and on disk"""
+        self._responseCache.pop(key, None)
+        try:
+            os.remove(os.path.join(self._responseCacheDir(), f"{key}.py"))
+        except OSError:
+            pass
+
+    def _settleResponseCache(self, succeeded):
+        """Cache the last call_ai response if its script ran successfully; evict it if it failed,
+        so failing code is never served again"""
+        pending, self._pendingResponse = self._pendingResponse, None
+        if pending is None:
+            return
+        key, text = pending
+        if not succeeded:
+            self._evictResponseCache(key)
+        elif text is not None:
+            self._writeResponseCache(key, text)
+
+    @staticmethod
+    def _parses(code):
+        """Whether code is syntactically valid Python"""
+        try:
+            ast.parse(code)
+        except SyntaxError:
+            return False
+        return True
+
+    def _extractCode(self, generated_code, code_context):
+        """Turn a raw model response into code: drop reasoning and markdown wrappers"""
+        # Strip <think> blocks from reasoning models (e.g. gpt-oss-120b), any case
+        generated_code = _THINK_RE.sub('', generated_code).strip()
+        
+        # Extract code from a markdown code block (```python or generic ```). The prompt asks
+        # for bare code, so a fence is only looked for when the response is not valid code;
+        # otherwise a fence is part of the code (e.g. a usage example in a docstring).
+        code = generated_code
+        if not self._parses(generated_code):
+            m = _CODE_FENCE_RE.search(generated_code)
+            if m:
+                # Cut at the last closing fence so trailing notes (even ones with
+                # `inline code`) are dropped
+                end = generated_code.rfind('```', m.end())
+                code = generated_code[m.end():end if end != -1 else None].strip()
+        
+        # Remove leading explanation comments but keep functional comments
+        if code.startswith('#'):
+            code_lines = code.split('\n')
+            start = 0
+            while start < len(code_lines) and code_lines[start].lstrip().startswith('#'):
+                lower_line = code_lines[start].lower()
+                if not any(word in lower_line for word in _LEAD_COMMENT_WORDS):
+                    break
+                start += 1
+            code = '\n'.join(code_lines[start:])
+        
+        final_code = code.strip()
+        
+        # Fallback to template if no valid code generated
+        if not final_code or len(final_code.strip()) < 50:
+            final_code = code_context
+        return final_code
+
+    def _firstParsingCandidate(self, client, request_args, code_context, count):
+        """Generate `count` responses concurrently and return the first whose code parses.
+
+        Candidates differ only in temperature so the prompt prefix stays cacheable.
+        A candidate whose code falls back to code_context does not count. If none
+        qualifies, the first response received is returned so the normal error
+        reporting of the debug loop applies.
+        """
+        self._streamedChars = 0
+        stop = threading.Event()
+        base_temperature = request_args.get('temperature', 0.3)
+        pending = set()
+        for i in range(count):
+            args = dict(request_args, temperature=min(base_temperature + 0.2 * i, 1.0))
+            pending.add(self._getExecutor().submit(self._streamCompletion, client, args, self._cancelEvent, stop))
+        first_response = None
+        first_error = None
+        reported = 0
+        try:
+            while pending:
+                self._wait_until(lambda: self._cancelEvent.is_set() or any(f.done() for f in pending), STREAM_PROGRESS_INTERVAL_MS)
+                if self._streamedChars != reported:
+                    reported = self._streamedChars
+                    self.diagnostic_print(f"Receiving responses... {reported} chars so far")
+                if self._cancelEvent.is_set():
+                    raise RequestCancelled()
+                for future in [f for f in pending if f.done()]:
+                    pending.discard(future)
+                    try:
+                        text = future.result()
+                    except Exception as e:
+                        first_error = first_error or e
+                        continue
+                    if first_response is None:
+                        first_response = text
+                    candidate_code = self._extractCode(text, code_context)
+                    if candidate_code == code_context:
+                        # Empty, too short or refused: _extractCode fell back to the previous
+                        # script, which parses but is not a fix
+                        self.diagnostic_print("Discarding candidate without usable code")
+                        continue
+                    try:
+                        ast.parse(candidate_code)
+                    except SyntaxError:
+                        self.diagnostic_print("Discarding candidate with a syntax error")
+                        continue
+                    return text
+        finally:
+            # Let the remaining candidates stop streaming; their results are not needed
+            stop.set()
+        if first_response is None and first_error is not None:
+            raise first_error
+        return first_response or ""
+
+    def call_ai(self, client, prompt, code_context, error_history, request_type="script", candidates=1):
+        self._pendingResponse = None
         
         # DIAGNOSTIC: Log what we're sending to the AI
         self.diagnostic_print("=" * 80)
         self.diagnostic_print("AI CALL DIAGNOSTIC")
         self.diagnostic_print(f"Request Type: {request_type}")
-        self.diagnostic_print(f"Prompt (first 200 chars): {prompt[:200]}...")
+        if self._verbose:
+            self.diagnostic_print(f"Prompt (first 200 chars): {prompt[:200]}...")
         self.diagnostic_print(f"Code Context Length: {len(code_context)} chars")
         self.diagnostic_print(f"Error History Length: {len(error_history)} chars")
-        if error_history:
+        if error_history and self._verbose:
             self.diagnostic_print(f"Error History (first 500 chars): {error_history[:500]}...")
         
         # Load prompt configuration with user request for RAG retrieval
@@ -908,8 +1484,14 @@ print("Script executed successfully!")
         self.diagnostic_print(f"Prompt source: {'custom' if PROMPTS_LOADED else 'built-in'}")
         self.diagnostic_print("=" * 80)
         
-        # Build system prompt from configuration
-        system_prompt = prompts['base'] + prompts['script_requirements']
+        # Build system prompt from configuration. It is identical across calls so the
+        # inference service can serve it from its prompt cache; everything that varies
+        # per request goes into the user prompt, after its static part.
+        system_prompt = prompts['script_system']
+        slicer_docs = prompts.get('slicer_docs', '')
+        if slicer_docs and '{slicer_docs}' not in prompts['user_template']:
+            # Custom template without a documentation slot: keep docs at the end of the system prompt
+            system_prompt += f"\n\n{slicer_docs}"
         
         # Build user prompt with error section if needed
         error_section = ""
@@ -917,6 +1499,7 @@ print("Script executed successfully!")
             error_section = prompts['error_section'].format(error_history=error_history)
         
         user_prompt = prompts['user_template'].format(
+            slicer_docs=slicer_docs,
             prompt=prompt,
             error_section=error_section,
             code_context=code_context
@@ -933,73 +1516,80 @@ print("Script executed successfully!")
             # Get AI parameters from configuration
             ai_params = prompts['ai_params']
             
-            response = client.chat.completions.create(
-                model=model_name,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=ai_params.get('temperature', 0.3),
-                max_tokens=ai_params.get('max_tokens', 8000)
-            )
-            
-            generated_code = response.choices[0].message.content.strip()
-            self.diagnostic_print(f"RECEIVED FROM AI - Code length: {len(generated_code)} chars")
-            
-            # Strip <think> tags from reasoning models (e.g. gpt-oss-120b)
-            import re
-            # Remove everything between <think> and </think> tags (including the tags)
-            generated_code = re.sub(r'<think>.*?</think>', '', generated_code, flags=re.DOTALL)
-            # Also handle case-insensitive variants
-            generated_code = re.sub(r'<think>.*?</think>', '', generated_code, flags=re.DOTALL|re.IGNORECASE)
-            generated_code = generated_code.strip()
-            
-            # Clean up the response
-            if generated_code.startswith("```python"):
-                # Extract code from markdown code block
-                code = generated_code[generated_code.find("```python")+9:]
-                code = code[:code.rfind("```")].strip()
-            elif generated_code.startswith("```"):
-                # Handle generic code blocks
-                code = generated_code[generated_code.find("```")+3:]
-                code = code[:code.rfind("```")].strip()
+            # With the cache off there is no key, no pending entry to settle and no hit count
+            caching = self._cacheMode != 'off'
+            cache_key = None
+            generated_code = None
+            if caching:
+                cache_key = self._responseCacheKey(model_name, system_prompt, user_prompt, ai_params)
+                generated_code = self._readResponseCache(cache_key)
+            if generated_code is not None:
+                self.stats['hits'] += 1
+                self._pendingResponse = (cache_key, None)
+                self.diagnostic_print(f"Response served from cache - Code length: {len(generated_code)} chars")
             else:
-                code = generated_code
-            
-            # Remove leading explanation comments but keep functional comments
-            code_lines = code.split('\n')
-            while code_lines and code_lines[0].strip().startswith('#') and any(word in code_lines[0].lower() for word in ['here', 'this', 'implementation', 'solution']):
-                code_lines.pop(0)
-            
-            final_code = '\n'.join(code_lines).strip()
+                if caching:
+                    self.stats['misses'] += 1
+                request_args = {
+                    'model': model_name,
+                    'messages': [
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    'temperature': ai_params.get('temperature', 0.3),
+                    'max_tokens': ai_params.get('max_tokens', 8000),
+                }
+                if candidates > 1:
+                    self.diagnostic_print(f"Requesting {candidates} candidate fixes in parallel")
+                    generated_code = self._firstParsingCandidate(client, request_args, code_context, candidates).strip()
+                else:
+                    # Stream the response on a worker thread so progress is visible from
+                    # the first token and the UI is not frozen while the model generates
+                    generated_code = self._runInBackground(self._streamCompletion, client, request_args, self._cancelEvent).strip()
+                self.diagnostic_print(f"RECEIVED FROM AI - Code length: {len(generated_code)} chars")
+                # Only stored once the script has run successfully (see _settleResponseCache)
+                if generated_code and caching:
+                    self._pendingResponse = (cache_key, generated_code)
+            if caching:
+                total = self.stats['hits'] + self.stats['misses']
+                self.diagnostic_print(f"Response cache: {self.stats['hits']}/{total} hits")
+            
+            final_code = self._extractCode(generated_code, code_context)
+            
+            # Cheap syntax check first: code that does not parse fails in the debug
+            # loop anyway, so the pattern validation below would be wasted on it
+            try:
+                tree = ast.parse(final_code)
+            except SyntaxError as e:
+                self.diagnostic_print(f"Generated code has a syntax error: {e}", error=True)
+                return final_code
             
-            # Fallback to template if no valid code generated
-            if not final_code or len(final_code.strip()) < 50:
-                final_code = code_context
+            self._parsedTrees[self._codeDigest(final_code)] = tree
             
             # Validate the generated code
-            validation_issues = self.validateSlicerCode(final_code)
+            validation_issues = self.validateSlicerCode(final_code, tree)
             if validation_issues:
                 self.diagnostic_print(f"Code validation warnings: {'; '.join(validation_issues[:3])}", error=True)
             
             return final_code
             
+        except RequestCancelled:
+            self.diagnostic_print("Request cancelled by user", error=True)
+            return None
+
         except Exception as e:
-            import traceback
             error_msg = str(e)
             
             # Check for rate limit errors
-            if "RateLimitError" in str(type(e).__name__) or "429" in error_msg or "rate limit" in error_msg.lower():
+            if "RateLimitError" in type(e).__name__ or _RATE_LIMIT_ERROR_RE.search(error_msg):
                 # Extract wait time if available
                 wait_time = "unknown"
-                if "wait" in error_msg.lower():
-                    import re
-                    wait_match = re.search(r'wait (\d+) seconds', error_msg)
-                    if wait_match:
-                        seconds = int(wait_match.group(1))
-                        hours = seconds // 3600
-                        minutes = (seconds % 3600) // 60
-                        wait_time = f"{hours}h {minutes}m" if hours > 0 else f"{minutes}m"
+                wait_match = _WAIT_SECONDS_RE.search(error_msg)
+                if wait_match:
+                    seconds = int(wait_match.group(1))
+                    hours = seconds // 3600
+                    minutes = (seconds % 3600) // 60
+                    wait_time = f"{hours}h {minutes}m" if hours > 0 else f"{minutes}m"
                 
                 self.diagnostic_print("❌ RATE LIMIT ERROR DETECTED", error=True)
                 self.diagnostic_print(f"You have exceeded your API quota. Wait time: {wait_time}", error=True)
@@ -1007,7 +1597,7 @@ print("Script executed successfully!")
                 return None  # Return None to signal failure
             
             # Check for authentication errors
-            elif "401" in error_msg or "authentication" in error_msg.lower() or "invalid" in error_msg.lower():
+            elif _AUTH_ERROR_RE.search(error_msg):
                 self.diagnostic_print("❌ AUTHENTICATION ERROR", error=True)
                 self.diagnostic_print("Jetstream2 inference is only reachable from the Jetstream2 network (or via VPN).", error=True)
                 self.diagnostic_print(f"Full error: {error_msg}", error=True)
@@ -1020,12 +1610,26 @@ print("Script executed successfully!")
                 self.diagnostic_print(f"Traceback: {traceback.format_exc()}", error=True)
                 return None  # Return None instead of template
 
-    def validateSlicerCode(self, code):
-        """Validate generated code against known Slicer API patterns and common mistakes"""
+    def validateSlicerCode(self, code, tree=None):
+        """Validate generated code against known Slicer API patterns and common mistakes.
+        Pass the already parsed ast tree, if any, to skip re-parsing for the syntax check."""
         issues = []
         
-        # Check for missing essential imports
-        if "import slicer" not in code:
+        # Check for basic Python syntax issues
+        if tree is None:
+            try:
+                tree = ast.parse(code)
+            except SyntaxError as e:
+                issues.append(f"SYNTAX ERROR: {str(e)}")
+        
+        # Check for missing essential imports (real import statements, not text in comments or strings)
+        if tree is not None:
+            has_slicer_import = any(
+                isinstance(node, ast.Import) and any(alias.name == 'slicer' or alias.name.startswith('slicer.') for alias in node.names)
+                for node in ast.walk(tree))
+        else:
+            has_slicer_import = "import slicer" in code
+        if not has_slicer_import:
             issues.append("Missing essential import: import slicer")
         
         # Check for SampleData usage without import
@@ -1035,10 +1639,7 @@ print("Script executed successfully!")
         # Check for common mistake: forgetting [0] on SampleData.downloadFromURL
         if "SampleData.downloadFromURL(" in code and "downloadFromURL(urls=" in code:
             # Check if followed by [0] within reasonable distance
-            import re
-            pattern = r'SampleData\.downloadFromURL\([^)]+\)(?!\[0\])'
-            matches = re.findall(pattern, code)
-            if matches:
+            if _DOWNLOAD_WITHOUT_INDEX_RE.search(code):
                 issues.append("CRITICAL: SampleData.downloadFromURL returns a LIST - must use [0] to get first element")
         
         # Check for node operations without None checks
@@ -1047,21 +1648,15 @@ print("Script executed successfully!")
                 issues.append("WARNING: Node operations without None checks may fail")
         
         # Check for lowercase VTK method names (common mistake)
-        vtk_method_patterns = ['.getname(', '.setname(', '.getid(', '.setvisibility(']
-        for pattern in vtk_method_patterns:
-            if pattern in code.lower() and pattern in code:
+        found_lowercase = set(_LOWERCASE_VTK_RE.findall(code))
+        for pattern in _LOWERCASE_VTK_METHODS:
+            if pattern in found_lowercase:
                 issues.append(f"ERROR: VTK uses CapitalCase methods - found lowercase '{pattern}'")
         
         # Check for invalid layout constants
         if "setLayout(0)" in code or "setLayout(1)" in code:
             issues.append("WARNING: Use named layout constants like slicer.vtkMRMLLayoutNode.SlicerLayoutOneUp3DView")
         
-        # Check for basic Python syntax issues
-        try:
-            compile(code, '<string>', 'exec')
-        except SyntaxError as e:
-            issues.append(f"SYNTAX ERROR: {str(e)}")
-        
         return issues
 
 
@@ -1079,6 +1674,13 @@ class DeveloperAgentWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
         self._currentObservedNode = None
         self._nodeModifiedTag = None
         self._isSyncing = False
+        # Diagnostic messages are queued and rendered in one batch shortly after
+        # the first one arrives, instead of re-laying out the view per message
+        self._appendBuffer = []
+        self._appendTimer = qt.QTimer()
+        self._appendTimer.setSingleShot(True)
+        self._appendTimer.setInterval(50)
+        self._appendTimer.timeout.connect(self._flushAppendBuffer)
 
     def setup(self):
         ScriptedLoadableModuleWidget.setup(self)
@@ -1116,6 +1718,19 @@ class DeveloperAgentWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
         self.modelSelector.setToolTip("Select the AI model to use for code generation. Different models have different rate limits and capabilities.\nUpdate models in Resources/prompts_config.py")
         setupFormLayout.addRow("AI Model:", self.modelSelector)
         
+        # --- Response Cache Mode ---
+        self.cacheModeSelector = qt.QComboBox()
+        for display_name, mode in [("On", "on"), ("Read only", "read_only"), ("Write only", "write_only"), ("Off", "off")]:
+            self.cacheModeSelector.addItem(display_name, mode)
+        self.cacheModeSelector.setToolTip("Reuse AI responses for identical requests (kept for 1 hour).\n"
+                                          "Read only: use stored responses but store nothing new.\n"
+                                          "Write only: always call the AI but store responses.")
+        setupFormLayout.addRow("Response Cache:", self.cacheModeSelector)
+
+        self.verboseCheckbox = qt.QCheckBox("Log prompt excerpts, failing code and full tracebacks")
+        self.verboseCheckbox.setChecked(False)
+        setupFormLayout.addRow("Verbose Diagnostics:", self.verboseCheckbox)
+        
         # --- Output Path Configuration ---
         outputPathLayout = qt.QHBoxLayout()
         self.outputPathLineEdit = qt.QLineEdit()
@@ -1144,6 +1759,10 @@ class DeveloperAgentWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
         # Initialize conversation view first (needed for error messages)
         self.conversationView = qt.QTextBrowser()
         self.conversationView.setMinimumHeight(200)
+        # Long sessions drop their oldest blocks instead of growing the document without bound;
+        # the view is append-only, so no undo history is kept
+        self.conversationView.document().setMaximumBlockCount(CONVERSATION_MAX_BLOCKS)
+        self.conversationView.setUndoRedoEnabled(False)
         devFormLayout.addRow(self.conversationView)
         
         # Check for required libraries and extensions
@@ -1186,7 +1805,13 @@ class DeveloperAgentWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
         self.generateScriptRadio.toggled.connect(self._onModeToggled)
         
         self.sendButton = qt.QPushButton("🚀 Send to Agent")
-        devFormLayout.addRow(self.sendButton)
+        self.cancelButton = qt.QPushButton("Cancel")
+        self.cancelButton.enabled = False
+        self.cancelButton.setToolTip("Stop waiting for the AI response of the current request")
+        sendLayout = qt.QHBoxLayout()
+        sendLayout.addWidget(self.sendButton)
+        sendLayout.addWidget(self.cancelButton)
+        devFormLayout.addRow(sendLayout)
         
         # --- Script Editor (after prompt) ---
         devFormLayout.addRow(qt.QLabel("<b>Script Editor</b>"))
@@ -1280,6 +1905,7 @@ class DeveloperAgentWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
 
         # Connections
         self.sendButton.clicked.connect(self.onSendPromptButtonClicked)
+        self.cancelButton.clicked.connect(self.onCancelButtonClicked)
 
         self.layout.addStretch(1)
 
@@ -1404,9 +2030,8 @@ class DeveloperAgentWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
         
         if hasattr(self.codeEditor, 'evalJS'):
             # Monaco editor
-            import json
             escaped_text = json.dumps(text)
-            self.codeEditor.evalJS(f'if (window.editor && window.editor.getModel) {{ window.editor.getModel().setValue({escaped_text}); }}')
+            self.codeEditor.evalJS(f'if (window.editor && window.editor.getModel) {{ {MONACO_SET_VALUE_JS % escaped_text} }}')
         elif hasattr(self.codeEditor, 'setPlainText'):
             # QTextEdit fallback
             try:
@@ -1601,7 +2226,6 @@ class DeveloperAgentWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
                     import __main__
                     exec(code, __main__.__dict__)
         except Exception as e:
-            import traceback
             error_msg = f"Error executing code:\n{str(e)}\n{traceback.format_exc()}"
             print(error_msg)
     
@@ -1672,7 +2296,6 @@ class DeveloperAgentWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
             exec(code, {'slicer': slicer, 'logging': logging, '__name__': '__main__'})
             print(f"✅ Executed: {node.GetName()}")
         except Exception as e:
-            import traceback
             error_msg = f"Error executing script:\n{str(e)}\n{traceback.format_exc()}"
             slicer.util.errorDisplay(error_msg)
             print(error_msg)
@@ -1701,7 +2324,7 @@ class DeveloperAgentWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
             self.setEditorEnabled(False)
             # Clear editor content
             if hasattr(self.codeEditor, 'evalJS'):
-                self.codeEditor.evalJS('if (window.editor && window.editor.getModel) { window.editor.getModel().setValue(""); }')
+                self.codeEditor.evalJS(f'if (window.editor && window.editor.getModel) {{ {MONACO_SET_VALUE_JS % json.dumps("")} }}')
             elif hasattr(self.codeEditor, 'setPlainText'):
                 self.codeEditor.setPlainText("")
             
@@ -1716,10 +2339,9 @@ class DeveloperAgentWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
         if node and hasattr(self.codeEditor, 'evalJS'):
             self._isSyncing = True
             text = node.GetText() if node.GetText() else ""
-            import json
             escaped_text = json.dumps(text)
             # Temporarily disable change detection while updating
-            self.codeEditor.evalJS(f'window.contentChanged = false; if (window.editor && window.editor.getModel) {{ window.editor.getModel().setValue({escaped_text}); }}')
+            self.codeEditor.evalJS(f'window.contentChanged = false; if (window.editor && window.editor.getModel) {{ {MONACO_SET_VALUE_JS % escaped_text} }}')
             self._isSyncing = False
         elif node and hasattr(self.codeEditor, 'setPlainText'):
             self._isSyncing = True
@@ -1747,9 +2369,8 @@ class DeveloperAgentWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
         """Update Monaco editor to display the node's content"""
         if node and hasattr(self.codeEditor, 'evalJS'):
             text = node.GetText() if node.GetText() else ""
-            import json
             escaped_text = json.dumps(text)
-            self.codeEditor.evalJS(f'if (window.editor && window.editor.getModel) {{ window.editor.getModel().setValue({escaped_text}); }}')
+            self.codeEditor.evalJS(f'if (window.editor && window.editor.getModel) {{ {MONACO_SET_VALUE_JS % escaped_text} }}')
     
     def forceEditorUpdate(self, node):
         """Force update the Monaco editor with the node's current content"""
@@ -1763,13 +2384,12 @@ class DeveloperAgentWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
         
         if hasattr(self.codeEditor, 'evalJS'):
             # Monaco editor - force update via JavaScript
-            import json
             escaped_text = json.dumps(text)
             updateScript = f'''
             (function() {{
                 try {{
                     if (window.editor && window.editor.getModel) {{
-                        window.editor.getModel().setValue({escaped_text});
+                        {MONACO_SET_VALUE_JS % escaped_text}
                         console.log("Editor content updated, length: {len(text)} chars");
                     }} else {{
                         console.log("Editor not ready yet");
@@ -1815,11 +2435,20 @@ class DeveloperAgentWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
             return None
     
     def appendToConversationView(self, message):
-        """Append a message to the conversation view"""
-        self.conversationView.append(f"<pre>{message}</pre>")
+        """Queue a message for the conversation view (rendered by _flushAppendBuffer)"""
+        self._appendBuffer.append(f"<pre>{message}</pre>")
+        if not self._appendTimer.isActive():
+            self._appendTimer.start()
+
+    def _flushAppendBuffer(self):
+        """Render all queued messages with a single append"""
+        self._appendTimer.stop()
+        if not self._appendBuffer:
+            return
+        self.conversationView.append("".join(self._appendBuffer))
+        self._appendBuffer = []
         self.conversationView.verticalScrollBar().setValue(
             self.conversationView.verticalScrollBar().maximum)
-        slicer.app.processEvents()
 
 
 
@@ -1840,10 +2469,9 @@ class DeveloperAgentWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
         self.logic.debugScriptEditor()
 
     def checkForOpenAILibrary(self):
-        """Check if the openai library is installed (needed to reach Jetstream2 inference)"""
-        try:
-            from openai import OpenAI
-        except ImportError:
+        """Check if the openai library is installed (needed to reach Jetstream2 inference).
+        Only locates the package; it is imported when the first request is sent."""
+        if _openAIClass is None and importlib.util.find_spec("openai") is None:
             self.showInstallMessage()
 
     def checkForScriptEditor(self):
@@ -1933,6 +2561,27 @@ class DeveloperAgentWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
 
 
 
+    def _validatedOutputPath(self, path):
+        """Create the output directory if missing, using a single stat otherwise.
+        Returns (path, isDirectory)."""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            # makedirs only returns once path is a directory (a concurrent creation is fine)
+            os.makedirs(path, exist_ok=True)
+            return path, True
+        return path, stat.S_ISDIR(st.st_mode)
+
+    def _setRequestRunning(self, running):
+        """Toggle Send/Cancel buttons while a request is in progress"""
+        self.sendButton.enabled = not running
+        self.cancelButton.enabled = running
+
+    def onCancelButtonClicked(self):
+        """Stop waiting for the AI response of the current request"""
+        self.logic.cancelRequest()
+        self.cancelButton.enabled = False
+
     def onSendPromptButtonClicked(self):
         userPrompt = self.promptTextEdit.toPlainText().strip()
 
@@ -1942,15 +2591,17 @@ class DeveloperAgentWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
 
         self.logic.setDebugIterations(self.debugIterationsSpinBox.value)
         self.logic.setModel(self.modelSelector.currentData)
-        self.sendButton.enabled = False
+        self.logic.setCacheMode(self.cacheModeSelector.currentData)
+        self.logic.setVerbose(self.verboseCheckbox.checked)
+        self._setRequestRunning(True)
 
         # --- Ask a Question mode ---
         if self.askQuestionRadio.isChecked():
             self.conversationView.append(f"<h2>Question</h2><b>Q:</b> {userPrompt}<br>"
                                          f"<i>Thinking, please wait...</i><hr>")
-            slicer.app.processEvents()
             try:
                 result = self.logic.processConversationalRequest(userPrompt)
+                self._flushAppendBuffer()
                 if result['success']:
                     # Render response as HTML paragraphs
                     answer_html = result['response'].replace('\n', '<br>')
@@ -1958,24 +2609,25 @@ class DeveloperAgentWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
                 else:
                     self.conversationView.append(f"❌ <b>Failed.</b><br><pre>{result['error']}</pre><hr>")
             except Exception as e:
+                self._flushAppendBuffer()
                 self.conversationView.append(f"❌ <b>An unexpected error occurred:</b><br><pre>{e}</pre><hr>")
                 logging.error(f"DeveloperAgent conversational error: {e}", exc_info=True)
             finally:
-                self.sendButton.enabled = True
+                self._setRequestRunning(False)
             return
 
         # --- Generate Script mode ---
         outputPath = self.outputPathLineEdit.text.strip()
         if not outputPath:
             slicer.util.warningDisplay("Please specify an output directory.")
-            self.sendButton.enabled = True
+            self._setRequestRunning(False)
             return
 
         # Get or create text node from embedded editor
         currentNode = self.getCurrentScriptNode()
         if not currentNode:
             slicer.util.warningDisplay("Could not get or create script node.")
-            self.sendButton.enabled = True
+            self._setRequestRunning(False)
             return
 
         # Get current code if checkbox is checked
@@ -1990,15 +2642,14 @@ class DeveloperAgentWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
 
         # Validate that the output path is accessible
         try:
-            if not os.path.exists(outputPath):
-                os.makedirs(outputPath)
-            elif not os.path.isdir(outputPath):
+            outputPath, isDir = self._validatedOutputPath(outputPath)
+            if not isDir:
                 slicer.util.warningDisplay(f"Output path is not a directory: {outputPath}")
-                self.sendButton.enabled = True
+                self._setRequestRunning(False)
                 return
         except Exception as e:
             slicer.util.warningDisplay(f"Cannot access output directory: {str(e)}")
-            self.sendButton.enabled = True
+            self._setRequestRunning(False)
             return
 
         mode = "Improving Existing Code" if currentCode else "Generating New Script"
@@ -2006,10 +2657,10 @@ class DeveloperAgentWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
                                      f"<b>Script:</b> {scriptName}<br>"
                                      f"<b>Request:</b> {userPrompt}<br>"
                                      f"<i>Processing, please wait...</i><hr>")
-        slicer.app.processEvents()
 
         try:
             result = self.logic.processRequestToNode(userPrompt, currentNode, outputPath, currentCode)
+            self._flushAppendBuffer()
 
             # ALWAYS update the editor to show generated code (even if execution failed)
             self.forceEditorUpdate(currentNode)
@@ -2017,16 +2668,23 @@ class DeveloperAgentWidget(ScriptedLoadableModuleWidget, VTKObservationMixin):
             if result['success']:
                 self.conversationView.append(f"✅ <b>Success!</b><br>{result['message']}<hr>")
             else:
+                error_text = result['error']
+                if len(error_text) > ERROR_PREVIEW_CHARS:
+                    logging.error(f"DeveloperAgent request failed:\n{error_text}")
+                    error_text = (error_text[:ERROR_PREVIEW_CHARS] +
+                                  f"\n... ({len(error_text) - ERROR_PREVIEW_CHARS} more characters in the application log)")
                 self.conversationView.append(f"❌ <b>Failed.</b><br>"
-                                             f"<b>Final Error:</b><br><pre>{result['error']}</pre><hr>")
+                                             f"<b>Final Error:</b><br><pre>{error_text}</pre><hr>")
                 self.conversationView.append(f"<b>ℹ️ Generated code has been loaded in the editor above for manual review and debugging.</b><hr>")
         except Exception as e:
+            self._flushAppendBuffer()
             self.forceEditorUpdate(currentNode)
             self.conversationView.append(f"❌ <b>An unexpected error occurred:</b><br><pre>{e}</pre><hr>")
             logging.error(f"DeveloperAgent unexpected error: {e}", exc_info=True)
         finally:
-            self.sendButton.enabled = True
+            self._setRequestRunning(False)
 
     def cleanup(self):
         """Clean up resources when module is closed"""
-        self.sendButton.enabled = True
+        self.logic.cancelRequest()
+        self._setRequestRunning(False)
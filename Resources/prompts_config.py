@@ -49,7 +49,7 @@ CODING BEST PRACTICES:
 - Follow PEP 8: snake_case for variables, CapitalCase for classes
 - Sequential execution: each step assumes previous step succeeded
 - VTK methods use CapitalCase (GetName, SetVisibility)
-- Reference the dynamically loaded Slicer documentation below for API usage patterns
+- Reference the Slicer documentation provided with the request for API usage patterns
 
 === SELF-VERIFICATION CHECKLIST (CHECK BEFORE OUTPUTTING CODE) ===
 ☐ All imports present (import slicer; import SampleData only if loading sample data)
@@ -117,16 +117,21 @@ print("✅ Completed successfully")
 
 
 # User prompt template for code generation
+# Static text comes first and per-request fields last, so consecutive requests share
+# the longest possible prompt prefix (lets the inference service reuse its prompt cache).
+# {slicer_docs} receives the documentation retrieved for this request.
 USER_PROMPT_TEMPLATE = """
-USER REQUEST:
-{prompt}
-
 CONTEXT AND CONSTRAINTS:
 - Target environment: 3D Slicer Python console
 - Expected output: Complete, executable Python code
 - Error handling: Include validation but let critical errors surface for debugging
 - User feedback: Use print() statements to communicate progress
 
+{slicer_docs}
+
+USER REQUEST:
+{prompt}
+
 {error_section}
 
 CODE CONTEXT (previous attempt or template):
@@ -290,5 +295,5 @@ DEFAULT_MODEL = "gpt-oss-120b"
 
 
 # Prompt version for tracking
-PROMPT_VERSION = "2.3.0"
-PROMPT_LAST_UPDATED = "2026-06-25"
+PROMPT_VERSION = "2.4.0"
+PROMPT_LAST_UPDATED = "2026-10-15"
@@ -248,9 +248,33 @@ class SlicerRAG:
         return '\n'.join(sections)
 
 
+_cached_retriever = None
+_cached_signature = None
+
+
+def _index_signature():
+    """Modification times of the index files, used to detect a rebuilt index"""
+    signature = []
+    for path in (INDEX_FILE, CURATED_FILE, TUTORIALS_INDEX_FILE):
+        try:
+            signature.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
 def get_rag_retriever():
-    """Get a RAG retriever instance"""
-    return SlicerRAG()
+    """Get a shared RAG retriever instance.
+
+    Loading the indexes (and the embedding model, if any) is expensive, so the
+    instance is reused until one of the index files changes on disk.
+    """
+    global _cached_retriever, _cached_signature
+    signature = _index_signature()
+    if _cached_retriever is None or signature != _cached_signature:
+        _cached_retriever = SlicerRAG()
+        _cached_signature = signature
+    return _cached_retriever
 
 
 if __name__ == '__main__':